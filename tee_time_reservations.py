@@ -5,6 +5,7 @@ tee_time_bot.py — Reserve golf tee times via RCGS API.
 Features
 - Earliest or "closest at/after target" slot selection
 - Optional sleep-until (e.g., 09:00 in a timezone) and timed polling
+- Async HTTP/2 over a warm keep-alive connection; hedged concurrent polls right after start
 - Retries with exponential backoff
 - Dry-run mode prints the selected slot without booking
 - Token via --token or GOLF_API_TOKEN env var
@@ -13,42 +14,135 @@ Features
 from __future__ import annotations
 
 import argparse
+import asyncio
+import bisect
+import logging
+import operator
 import os
+import random
 import sys
 import time
 import json
+from dataclasses import dataclass
 from datetime import datetime, date, timedelta
-from typing import List, Dict, Optional, Any, Tuple
+from typing import Awaitable, Callable, List, Dict, Optional, Any, Set, Tuple
 from zoneinfo import ZoneInfo
 
-import requests
+import httpx
+import msgspec
+
+logger = logging.getLogger(__name__)
 
 
 # ---------- HTTP helpers ----------
 
-def post(base_url: str, path: str, payload: dict, timeout: float = 5.0) -> requests.Response:
-    url = base_url.rstrip("/") + path
-    # The API accepts JSON without custom headers.
-    return requests.post(url, json=payload, timeout=timeout)
+MAX_CONNECTIONS = 4    # pool size; enough for the initial burst plus the reservation
+PRECONNECT_LEAD = 5.0  # seconds before the release to resolve DNS and open a first socket
+WARMUP_LEAD = 0.3      # seconds before the release to top the pool up to --burst sockets
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+class TransientError(Exception):
+    """Server-side 5xx while polling; plain and cheap, handled by the poll backoff."""
+
+    def __init__(self, status: int) -> None:
+        super().__init__(status)
+        self.status = status
+
+    def __str__(self) -> str:
+        return f"HTTP {self.status}"
+
+
+async def post_raw(
+    client: httpx.AsyncClient,
+    path: str,
+    body: bytes,
+) -> bytes:
+    """
+    Returns the raw response body for polling.
+    Raises TransientError on 5xx and httpx.HTTPStatusError on any other non-2xx.
+    """
+    # Body is pre-serialized JSON so hot-loop callers can build it once.
+    r = await client.post(path, content=body, headers=JSON_HEADERS)
+    status = r.status_code
+    if status >= 500:
+        # Skip building an HTTPStatusError (message, request/response refs)
+        # for an error the caller just backs off from
+        raise TransientError(status)
+    if not r.is_success:
+        r.raise_for_status()
+    return r.content
+
+
+async def post(client: httpx.AsyncClient, path: str, body: bytes) -> Any:
+    r = await client.post(path, content=body, headers=JSON_HEADERS)
+    r.raise_for_status()
+    return msgspec.json.decode(r.content)
+
+
+async def warm_up(client: httpx.AsyncClient, n: int = 1, *, limit: float) -> None:
+    """
+    Open the pooled TCP/TLS connection(s) ahead of time so the first real
+    requests reuse them. Over HTTP/2 one connection carries every request;
+    n concurrent requests matter only if the server falls back to HTTP/1.1.
+    Gives up after `limit` seconds so a slow server can't delay the release poll.
+    """
+    if limit <= 0:
+        return
+    try:
+        results = await asyncio.wait_for(
+            asyncio.gather(*[client.head("/") for _ in range(n)], return_exceptions=True), limit
+        )
+    except asyncio.TimeoutError:
+        print(f"[warn] connection warm-up did not finish within {limit:.2f}s; skipping", flush=True)
+        return
+    errors = [e for e in results if isinstance(e, BaseException)]
+    if errors:
+        # Not fatal: the first real requests will simply pay the handshake
+        print(f"[warn] connection warm-up failed ({len(errors)}/{n}): {type(errors[0]).__name__}: {errors[0]}", flush=True)
 
 
 # ---------- Domain logic ----------
 
+class Slot(msgspec.Struct):
+    """
+    One entry of the GolfHorasLeer response; unknown fields are ignored.
+    Fields are optional so one odd row doesn't reject the list; rows missing
+    what we need to pick or book are filtered out in get_availability.
+    """
+    Hora: Optional[str] = None
+    Fecha: Optional[str] = None
+    Recorrido: Optional[str] = None
+    NumeroJugadoresMaximo: int = 4
+
+
+# Decoders are reusable and skip per-call type setup
+_slots_decoder = msgspec.json.Decoder(List[Slot])
+
+
 def to_minutes(hhmm: str) -> int:
     h, m = map(int, hhmm.split(":"))
     return 60 * h + m
 
 
-def get_availability(
-    base_url: str,
+def hora_minutes(hora: str) -> Optional[int]:
+    """Minutes for an API "HH:MM" time, or None if it can't be parsed."""
+    try:
+        if len(hora) >= 5 and hora[2] == ":":
+            # Usual zero-padded form: slice rather than split
+            return int(hora[:2]) * 60 + int(hora[3:5])
+        return to_minutes(hora)
+    except ValueError:
+        return None
+
+
+def availability_body(
     token: str,
     for_date: str,
     recorrido: str,
     players: int,
     filtro_hora: Optional[str] = None,
-    *,
-    timeout: float = 5.0,
-) -> List[Dict[str, Any]]:
+) -> bytes:
     payload = {
         "Token": token,
         "FiltroFecha": for_date,                 # "YYYY-MM-DD"
@@ -59,55 +153,90 @@ def get_availability(
     # Pass FiltroHora only if provided (API may treat empty differently)
     if filtro_hora:
         payload["FiltroHora"] = filtro_hora
-    
-    print(payload)
 
-    r = post(base_url, "/api/GolfHorasLeer", payload, timeout=timeout)
-    r.raise_for_status()
-    data = r.json()
+    logger.debug("availability payload=%s", {**payload, "Token": "***"})
+    return msgspec.json.encode(payload)
+
+
+@dataclass
+class AvailabilityCache:
+    """Last availability response, so unchanged polls skip parsing and filtering."""
+    raw: Optional[bytes] = None
+    result: Optional[Tuple[List[Slot], List[int]]] = None
+
+
+async def get_availability(
+    client: httpx.AsyncClient,
+    body: bytes,
+    players: int,
+    cache: Optional[AvailabilityCache] = None,
+) -> Tuple[List[Slot], List[int]]:
+    """
+    body: request bytes from availability_body(), reused across polls.
+    cache: if given, reuse the previous result when the body is byte-identical.
+           (No If-None-Match: on a POST a matching ETag yields 412, not 304.)
+    Returns (avails, minutes) where minutes[i] is avails[i].Hora in minutes.
+    """
+    raw = await post_raw(client, "/api/GolfHorasLeer", body)
+    if cache is not None and cache.result is not None and raw == cache.raw:
+        return cache.result
+
+    data = _slots_decoder.decode(raw)
+
+    # One pass filters by capacity, drops rows we couldn't book or whose
+    # Hora doesn't parse, and parses each time once; then sort by time of day.
+    min_cap = int(players)
+    pairs = []
+    for a in data:
+        if a.NumeroJugadoresMaximo >= min_cap and a.Hora and a.Fecha and a.Recorrido:
+            m = hora_minutes(a.Hora)
+            if m is not None:
+                pairs.append((m, a))
+    pairs.sort(key=operator.itemgetter(0))
+    result = [a for _, a in pairs], [m for m, _ in pairs]
+    if cache is not None:
+        cache.raw, cache.result = raw, result
+    return result
+
+
+Picker = Callable[[List[Slot], List[int]], Optional[Slot]]
+
 
-    # Expect list of {"Fecha","Hora","Recorrido","NumeroJugadoresMaximo"}
-    # Filter by capacity; sort by time of day.
-    avails = [x for x in data if x.get("NumeroJugadoresMaximo", 4) >= int(players)]
-    avails.sort(key=lambda a: to_minutes(a["Hora"]))
-    return avails
+def _pick_earliest(avails: List[Slot], minutes: List[int]) -> Optional[Slot]:
+    return avails[0] if avails else None
 
 
-def pick_slot(
-    avails: List[Dict[str, Any]],
-    mode: str,
-    target_time: Optional[str],
-) -> Optional[Dict[str, Any]]:
+def make_picker(mode: str, target_time: Optional[str]) -> Picker:
     """
+    Bind the slot-selection strategy once, before polling starts.
+    The returned picker takes (avails, minutes), where minutes is the sorted
+    time-of-day of each slot aligned with avails.
     mode:
       - 'earliest': absolute earliest by time-of-day
       - 'closest': choose the time >= target_time (not before). If none, return None.
     """
-    if not avails:
-        return None
-
     if mode == "earliest" or not target_time:
-        return avails[0]
+        return _pick_earliest
 
     if mode == "closest":
         t0 = to_minutes(target_time)
-        candidates = [a for a in avails if to_minutes(a["Hora"]) >= t0]
-        if not candidates:
-            return None
-        return candidates[0]
+
+        def pick_closest(avails: List[Slot], minutes: List[int]) -> Optional[Slot]:
+            i = bisect.bisect_left(minutes, t0)
+            return avails[i] if i < len(avails) else None
+
+        return pick_closest
 
     raise ValueError(f"Unknown mode: {mode}")
 
 
-def reserve(
-    base_url: str,
+async def reserve(
+    client: httpx.AsyncClient,
     token: str,
     fecha: str,
     hora: str,
     recorrido: str,
     players: int,
-    *,
-    timeout: float = 5.0,
 ) -> Dict[str, Any]:
     payload = {
         "Token": token,
@@ -116,66 +245,159 @@ def reserve(
         "Hora": hora,
         "Recorrido": recorrido,
     }
-    r = post(base_url, "/api/GolfReservaAlta", payload, timeout=timeout)
-    r.raise_for_status()
-    return r.json()  # expects {"CodigoReserva": ...}
+    return await post(client, "/api/GolfReservaAlta", msgspec.json.encode(payload))  # expects {"CodigoReserva": ...}
 
 
 # ---------- Scheduling / polling ----------
 
-def sleep_until(target_dt: datetime) -> None:
-    while True:
-        now = datetime.now(target_dt.tzinfo)
-        delta = (target_dt - now).total_seconds()
-        if delta <= 0:
-            return
-        # Sleep in small-ish chunks so Ctrl+C remains responsive
-        time.sleep(min(delta, 0.5))
+SPIN_WINDOW = 0.05  # seconds before the target spent busy-waiting instead of sleeping
+
+
+def to_deadline(target_dt: datetime) -> float:
+    # Convert the wall-clock target into a deadline on the monotonic
+    # perf_counter clock once; the waits below never build datetimes.
+    return time.perf_counter() + (target_dt - datetime.now(target_dt.tzinfo)).total_seconds()
+
+
+async def sleep_until(deadline: float) -> None:
+    """Wait until perf_counter() reaches deadline (see to_deadline)."""
+    while (delta := deadline - time.perf_counter()) > SPIN_WINDOW:
+        # Sleep in small-ish chunks so Ctrl+C remains responsive; asyncio.sleep
+        # lets the client's connections keep being serviced meanwhile
+        await asyncio.sleep(min(delta - SPIN_WINDOW, 0.5))
+    # Sleeps can overshoot by scheduler jitter; spin the last few ms
+    while time.perf_counter() < deadline:
+        pass
+
+
+def poll_delay(elapsed: float, poll_every: float) -> float:
+    """
+    Delay before the next poll, `elapsed` seconds after polling started.
+    Polls every 20ms for the first 2s, 100ms until 10s, then every poll_every
+    (never slower than poll_every). Adds up to 20% jitter so we don't run in
+    lockstep with other bookers.
+    """
+    if elapsed < 2.0:
+        delay = 0.02
+    elif elapsed < 10.0:
+        delay = 0.1
+    else:
+        delay = poll_every
+    delay = min(delay, poll_every)
+    return delay + random.uniform(0, delay * 0.2)
 
 
-def poll_for_slot(
-    base_url: str,
+HEDGE_WINDOW = 0.5  # seconds after start during which polls are hedged
+
+
+def _drain(task: asyncio.Task) -> None:
+    # Mark a stray task's exception as retrieved so asyncio doesn't log it
+    if not task.cancelled():
+        task.exception()
+
+
+async def fetch_hedged(
+    client: httpx.AsyncClient,
+    body: bytes,
+    players: int,
+    n: int,
+    inflight: Set[asyncio.Task],
+    cache: Optional[AvailabilityCache] = None,
+) -> Tuple[List[Slot], List[int]]:
+    """
+    Keep n availability requests in flight and return the first that succeeds.
+    Unfinished requests stay in `inflight` so the next call tops up to n instead of
+    piling on more. They are not cancelled, so their pooled connections stay open.
+    Requests that finished since the last call are dropped first: their answers
+    predate the round and would only replay old data.
+    Raises the first error only if every in-flight request failed.
+    """
+    inflight.difference_update([task for task in inflight if task.done()])
+    while len(inflight) < n:
+        task = asyncio.ensure_future(get_availability(client, body, players, cache))
+        task.add_done_callback(_drain)
+        inflight.add(task)
+
+    error: Optional[BaseException] = None
+    while inflight:
+        done, _ = await asyncio.wait(inflight, return_when=asyncio.FIRST_COMPLETED)
+        inflight.difference_update(done)
+        result = None
+        for task in done:
+            exc = task.exception()
+            if exc is None:
+                result = task.result()
+            elif error is None:
+                error = exc
+        if result is not None:
+            return result
+    assert error is not None
+    raise error
+
+
+async def poll_for_slot(
+    client: httpx.AsyncClient,
     token: str,
     the_date: str,
     recorrido: str,
     players: int,
     filtro_hora: Optional[str],
-    mode: str,
-    target_time: Optional[str],
+    picker: Picker,
     *,
     poll_every: float,
     max_wait_seconds: float,
-    timeout: float = 5.0,
-) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
+    burst: int = 3,
+    reserve_fn: Optional[Callable[[Slot], Awaitable[Dict[str, Any]]]] = None,
+) -> Tuple[Optional[Slot], List[Slot], Optional[Dict[str, Any]]]:
     """
     Repeatedly fetch availability until a valid selection is possible or time runs out.
-    Returns (picked_slot, last_avails).
+    For the first HEDGE_WINDOW seconds each round keeps `burst` concurrent requests in
+    flight and uses whichever answers first; later rounds send one at a time,
+    quickly at first and decaying to poll_every (see poll_delay).
+    If reserve_fn is given it is awaited the moment a slot is picked, while the
+    connection is still warm; its errors propagate to the caller.
+    Returns (picked_slot, last_avails, reservation_response_or_None).
     """
-    deadline = time.time() + max_wait_seconds
+    started = start = time.monotonic()
+    deadline = start + max_wait_seconds
     backoff = 0.0  # extra delay after transient HTTP errors
-    last_avails: List[Dict[str, Any]] = []
+    last_avails: List[Slot] = []
+    inflight: Set[asyncio.Task] = set()  # hedged requests still outstanding
+    # The request never changes while polling; serialize it once.
+    body = availability_body(token, the_date, recorrido, players, filtro_hora)
+    cache = AvailabilityCache()
 
     while True:
         try:
-            avails = get_availability(
-                base_url, token, the_date, recorrido, players, filtro_hora, timeout=timeout
-            )
+            if burst > 1 and time.monotonic() - started < HEDGE_WINDOW:
+                avails, minutes = await fetch_hedged(client, body, players, burst, inflight, cache)
+            else:
+                avails, minutes = await get_availability(client, body, players, cache)
+        except (TransientError, httpx.HTTPError, msgspec.DecodeError) as e:
+            # Network/server error or a garbled body — short exponential backoff
+            backoff = min(2.0 if backoff == 0.0 else backoff * 2.0, 8.0)
+            print(f"[warn] availability fetch error: {type(e).__name__}: {e}. Backing off {backoff:.1f}s", flush=True)
+            # Jitter keeps us from retrying in lockstep with other clients
+            await asyncio.sleep(backoff + random.uniform(0, backoff * 0.3))
+            # Poll aggressively again once the server recovers
+            start = time.monotonic()
+        else:
             last_avails = avails
-            pick = pick_slot(avails, mode, target_time)
+            backoff = 0.0  # server is healthy again; next error starts from the bottom
+            pick = picker(avails, minutes)
             if pick is not None:
-                return pick, avails
+                # Book right here rather than after returning: nothing runs
+                # between seeing the slot and asking for it.
+                resp = await reserve_fn(pick) if reserve_fn is not None else None
+                return pick, avails, resp
             # No acceptable slot yet; continue polling
             # (e.g., "closest" after a specific time)
-        except requests.RequestException as e:
-            # Network or server error — short exponential backoff
-            backoff = min(2.0 if backoff == 0.0 else backoff * 2.0, 8.0)
-            print(f"[warn] availability fetch error: {e}. Backing off {backoff:.1f}s", flush=True)
-            time.sleep(backoff)
 
-        if time.time() >= deadline:
-            return None, last_avails
+        now = time.monotonic()
+        if now >= deadline:
+            return None, last_avails, None
 
-        time.sleep(poll_every)
+        await asyncio.sleep(poll_delay(now - start, poll_every))
 
 
 # ---------- CLI ----------
@@ -200,6 +422,7 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--filtro-hora", default=None,
                    help="Optional FiltroHora for availability (HH:MM); omit to get full list")
     p.add_argument("--dry-run", action="store_true", help="Do not submit reservation")
+    p.add_argument("--verbose", action="store_true", help="Log request payloads (token redacted)")
 
     # Timing controls
     p.add_argument("--wait-until", default=None,
@@ -207,16 +430,23 @@ def parse_args() -> argparse.Namespace:
     p.add_argument("--tz", default=tz_default,
                    help="Time zone for --wait-until (IANA name, e.g., Europe/Madrid or America/New_York)")
     p.add_argument("--poll-every", type=float, default=0.25,
-                   help="Polling cadence in seconds once started")
+                   help="Steady-state polling cadence in seconds (faster for the first ~10s)")
     p.add_argument("--max-wait", type=float, default=180.0,
                    help="Max seconds to wait for an acceptable slot after start")
     p.add_argument("--timeout", type=float, default=5.0,
                    help="HTTP timeout per request (seconds)")
+    p.add_argument("--burst", type=int, default=3,
+                   help="Concurrent availability requests kept in flight during the first 0.5s")
     return p.parse_args()
 
 
-def main() -> int:
+async def main() -> int:
     args = parse_args()
+    # Root stays at WARNING so httpx/httpcore/h2 don't log every poll;
+    # --verbose only opens up this module's own logger.
+    logging.basicConfig(level=logging.WARNING, format="[%(levelname)s] %(message)s")
+    if args.verbose:
+        logger.setLevel(logging.DEBUG)
 
     token = args.token or os.environ.get("GOLF_API_TOKEN")
     if not token:
@@ -224,6 +454,7 @@ def main() -> int:
         return 2
 
     # Optional sleep-until (e.g., 09:00 local in a given TZ)
+    target: Optional[datetime] = None
     if args.wait_until:
         tz = ZoneInfo(args.tz)
         now = datetime.now(tz)
@@ -232,28 +463,73 @@ def main() -> int:
         # if target <= now:
         #     target += timedelta(days=1)  # next day if already past
         print(f"[info] waiting until {target.isoformat()} in {args.tz}", flush=True)
-        sleep_until(target)
 
-    # Poll for availability and pick a slot according to mode/target.
+    # One keep-alive HTTP/2 client for every poll and the final reservation
+    limits = httpx.Limits(max_connections=MAX_CONNECTIONS, keepalive_expiry=60)
+    async with httpx.AsyncClient(
+        http2=True, base_url=args.base_url.rstrip("/"), timeout=args.timeout, limits=limits,
+        follow_redirects=True,  # like requests.post did; httpx defaults to not following
+    ) as client:
+        if target is not None:
+            # Resolve + connect a few seconds early (keep-alive holds the socket), then
+            # open one socket per hedged request just before the release, so the
+            # first polls skip DNS and the TCP/TLS handshakes.
+            # Each warm-up is capped to finish before the next step is due.
+            release = to_deadline(target)
+            await sleep_until(release - PRECONNECT_LEAD)
+            await warm_up(client, limit=release - WARMUP_LEAD - time.perf_counter())
+            await sleep_until(release - WARMUP_LEAD)
+            await warm_up(client, max(1, min(args.burst, MAX_CONNECTIONS)),
+                          limit=release - SPIN_WINDOW - time.perf_counter())
+            await sleep_until(release)
+        return await run(client, args, token)
+
+
+def fmt_slot(s: Slot) -> str:
+    return f"{s.Fecha} {s.Hora} | {s.Recorrido} | max={s.NumeroJugadoresMaximo}"
+
+
+async def run(client: httpx.AsyncClient, args: argparse.Namespace, token: str) -> int:
+    async def reserve_now(slot: Slot) -> Dict[str, Any]:
+        # A short stdout write costs microseconds; report the pick as it happens
+        print(f"[pick] {fmt_slot(slot)}", flush=True)
+        return await reserve(
+            client,
+            token=token,
+            fecha=slot.Fecha,
+            hora=slot.Hora,
+            recorrido=slot.Recorrido,
+            players=args.players,
+        )
+
+    # Poll for availability, pick a slot according to mode/target and book it.
     print(f"[info] querying availability date={args.date} recorrido='{args.recorrido}' players={args.players}", flush=True)
-    pick, avails = poll_for_slot(
-        base_url=args.base_url,
-        token=token,
-        the_date=args.date,
-        recorrido=args.recorrido,
-        players=args.players,
-        filtro_hora=args.filtro_hora,
-        mode=args.mode,
-        target_time=args.target_time,
-        poll_every=args.poll_every,
-        max_wait_seconds=args.max_wait,
-        timeout=args.timeout,
-    )
+    try:
+        pick, avails, resp = await poll_for_slot(
+            client,
+            token=token,
+            the_date=args.date,
+            recorrido=args.recorrido,
+            players=args.players,
+            filtro_hora=args.filtro_hora,
+            picker=make_picker(args.mode, args.target_time),
+            poll_every=args.poll_every,
+            max_wait_seconds=args.max_wait,
+            burst=args.burst,
+            reserve_fn=None if args.dry_run else reserve_now,
+        )
+    except httpx.HTTPStatusError as e:
+        # Show API error content to aid troubleshooting
+        print(f"[error] reservation failed: {e} body={e.response.text}", file=sys.stderr)
+        return 3
+    except httpx.HTTPError as e:
+        print(f"[error] network error during reservation: {type(e).__name__}: {e}", file=sys.stderr)
+        return 3
+    except msgspec.DecodeError as e:
+        print(f"[error] unreadable reservation response: {e}", file=sys.stderr)
+        return 3
 
     # Pretty print what we saw
-    def fmt_slot(s: Dict[str, Any]) -> str:
-        return f"{s.get('Fecha')} {s.get('Hora')} | {s.get('Recorrido')} | max={s.get('NumeroJugadoresMaximo')}"
-
     if avails:
         preview = ", ".join(fmt_slot(s) for s in avails[:5])
         overflow = "" if len(avails) <= 5 else f" (+{len(avails)-5} more)"
@@ -265,40 +541,16 @@ def main() -> int:
         print("[result] no acceptable slot found within max-wait window", flush=True)
         return 1
 
-    print(f"[pick] {fmt_slot(pick)}", flush=True)
-
     if args.dry_run:
+        print(f"[pick] {fmt_slot(pick)}", flush=True)
         print("[result] dry-run enabled — not booking", flush=True)
         return 0
 
-    # Attempt reservation
-    try:
-        resp = reserve(
-            base_url=args.base_url,
-            token=token,
-            fecha=pick["Fecha"],
-            hora=pick["Hora"],
-            recorrido=pick["Recorrido"],
-            players=args.players,
-            timeout=args.timeout,
-        )
-        # Minimal structured result to stdout for easy piping
-        print("[result] reservation created")
-        print(json.dumps(resp, ensure_ascii=False))
-        return 0
-    except requests.HTTPError as e:
-        # Show API error content to aid troubleshooting
-        detail = ""
-        try:
-            detail = f" body={e.response.text}"
-        except Exception:
-            pass
-        print(f"[error] reservation failed: {e}{detail}", file=sys.stderr)
-        return 3
-    except requests.RequestException as e:
-        print(f"[error] network error during reservation: {e}", file=sys.stderr)
-        return 3
+    # Minimal structured result to stdout for easy piping
+    print("[result] reservation created")
+    print(json.dumps(resp, ensure_ascii=False))
+    return 0
 
 
 if __name__ == "__main__":
-    sys.exit(main())
+    sys.exit(asyncio.run(main()))